@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
@@ -17,9 +19,17 @@ def get_document_model():
     Defaults to the standard :class:`~wagtail.documents.models.Document` model
     if no custom model is defined.
     """
+    return _get_document_model(get_document_model_string())
+
+
+@lru_cache(maxsize=None)
+def _get_document_model(model_string):
+    # Cached on the model string rather than on the setting itself, so that
+    # changes to WAGTAILDOCS_DOCUMENT_MODEL (e.g. via override_settings) are
+    # picked up without needing to clear the cache.
+    # Lookup failures raise an exception, so they are never cached.
     from django.apps import apps
 
-    model_string = get_document_model_string()
     try:
         return apps.get_model(model_string, require_ready=False)
     except ValueError:
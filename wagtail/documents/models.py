@@ -1,6 +1,7 @@
 import os.path
 import urllib
 from contextlib import contextmanager
+from functools import lru_cache
 from mimetypes import guess_type
 
 from django.conf import settings
@@ -17,6 +18,16 @@ from wagtail.search.queryset import SearchableQuerySetMixin
 from wagtail.utils.file import hash_filelike
 
 
+@lru_cache(maxsize=None)
+def get_extension_validator(allowed_extensions):
+    """
+    Return a FileExtensionValidator for the given tuple of extensions, so that
+    one is only constructed per distinct WAGTAILDOCS_EXTENSIONS value rather than
+    on every call to Document.clean().
+    """
+    return FileExtensionValidator(allowed_extensions)
+
+
 class DocumentQuerySet(SearchableQuerySetMixin, models.QuerySet):
     pass
 
@@ -70,7 +81,7 @@ class AbstractDocument(CollectionMember, index.Indexed, models.Model):
         """
         allowed_extensions = getattr(settings, "WAGTAILDOCS_EXTENSIONS", None)
         if allowed_extensions:
-            validate = FileExtensionValidator(allowed_extensions)
+            validate = get_extension_validator(tuple(allowed_extensions))
             validate(self.file)
 
     def is_stored_locally(self):
@@ -153,7 +164,14 @@ class AbstractDocument(CollectionMember, index.Indexed, models.Model):
 
     @property
     def file_extension(self):
-        return os.path.splitext(self.filename)[1][1:]
+        # Cache the extension against the filename it was derived from, so that
+        # it is still correct after the file is replaced or renamed
+        filename = self.filename
+        cached = getattr(self, "_file_extension_cache", None)
+        if cached is None or cached[0] != filename:
+            cached = (filename, os.path.splitext(filename)[1][1:])
+            self._file_extension_cache = cached
+        return cached[1]
 
     @property
     def url(self):
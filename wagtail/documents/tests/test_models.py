@@ -1,9 +1,10 @@
+from unittest import mock
+
 from django.conf import settings
 from django.contrib.auth.models import Group, Permission
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.files.base import ContentFile
-from django.db import transaction
-from django.test import TestCase, TransactionTestCase
+from django.test import TestCase
 from django.test.utils import override_settings
 
 from wagtail.documents import (
@@ -18,73 +19,102 @@ from wagtail.test.testapp.models import CustomDocument, ReimportedDocumentModel
 from wagtail.test.utils import WagtailTestUtils
 
 
-class TestDocumentQuerySet(TransactionTestCase):
-    fixtures = ["test_empty.json"]
-
+class TestDocumentQuerySet(TestCase):
     def test_search_method(self):
         # Make a test document
         document = models.Document.objects.create(title="Test document")
 
         # Search for it
         results = models.Document.objects.search("Test")
-        self.assertEqual(list(results), [document])
+        self.assertQuerySetEqual(results, [document])
 
     def test_operators(self):
-        aaa_document = models.Document.objects.create(title="AAA Test document")
-        zzz_document = models.Document.objects.create(title="ZZZ Test document")
+        # bulk_create skips the search index signals; the default test backend
+        # (database fallback) queries the model table directly, so this is fine
+        models.Document.objects.bulk_create(
+            [
+                models.Document(title="AAA Test document"),
+                models.Document(title="ZZZ Test document"),
+            ]
+        )
 
         results = models.Document.objects.search("aaa test", operator="and")
-        self.assertEqual(list(results), [aaa_document])
+        self.assertQuerySetEqual(
+            results, ["AAA Test document"], transform=lambda doc: doc.title
+        )
 
         results = models.Document.objects.search("aaa test", operator="or")
-        sorted_results = sorted(results, key=lambda doc: doc.title)
-        self.assertEqual(sorted_results, [aaa_document, zzz_document])
+        self.assertQuerySetEqual(
+            results,
+            ["AAA Test document", "ZZZ Test document"],
+            transform=lambda doc: doc.title,
+            ordered=False,
+        )
 
     def test_custom_ordering(self):
-        aaa_document = models.Document.objects.create(title="AAA Test document")
-        zzz_document = models.Document.objects.create(title="ZZZ Test document")
+        # bulk_create skips the search index signals; the default test backend
+        # (database fallback) queries the model table directly, so this is fine
+        models.Document.objects.bulk_create(
+            [
+                models.Document(title="AAA Test document"),
+                models.Document(title="ZZZ Test document"),
+            ]
+        )
 
         results = models.Document.objects.order_by("title").search(
             "Test", order_by_relevance=False
         )
-        self.assertEqual(list(results), [aaa_document, zzz_document])
+        self.assertQuerySetEqual(
+            results,
+            ["AAA Test document", "ZZZ Test document"],
+            transform=lambda doc: doc.title,
+        )
         results = models.Document.objects.order_by("-title").search(
             "Test", order_by_relevance=False
         )
-        self.assertEqual(list(results), [zzz_document, aaa_document])
+        self.assertQuerySetEqual(
+            results,
+            ["ZZZ Test document", "AAA Test document"],
+            transform=lambda doc: doc.title,
+        )
 
 
 class TestDocumentPermissions(WagtailTestUtils, TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         # Create some user accounts for testing permissions
-        self.user = self.create_user(
+        cls.user = cls.create_user(
             username="user", email="user@email.com", password="password"
         )
-        self.owner = self.create_user(
+        cls.owner = cls.create_user(
             username="owner", email="owner@email.com", password="password"
         )
-        self.editor = self.create_user(
+        cls.editor = cls.create_user(
             username="editor", email="editor@email.com", password="password"
         )
-        self.editor.groups.add(Group.objects.get(name="Editors"))
-        self.administrator = self.create_superuser(
+        cls.editor.groups.add(
+            Group.objects.values_list("pk", flat=True).get(name="Editors")
+        )
+        cls.administrator = cls.create_superuser(
             username="administrator",
             email="administrator@email.com",
             password="password",
         )
 
         # Owner user must have the add_document permission
-        self.adders_group = Group.objects.create(name="Document adders")
+        cls.adders_group = Group.objects.create(name="Document adders")
+        root_collection = Collection.get_first_root_node()
+        add_document_permission = Permission.objects.get(codename="add_document")
         GroupCollectionPermission.objects.create(
-            group=self.adders_group,
-            collection=Collection.get_first_root_node(),
-            permission=Permission.objects.get(codename="add_document"),
+            group=cls.adders_group,
+            collection=root_collection,
+            permission=add_document_permission,
         )
-        self.owner.groups.add(self.adders_group)
+        cls.owner.groups.add(cls.adders_group)
 
         # Create a document for running tests on
-        self.document = models.Document.objects.create(
-            title="Test document", uploaded_by_user=self.owner
+        cls.document = models.Document.objects.create(
+            title="Test document", uploaded_by_user=cls.owner
         )
 
     def test_administrator_can_edit(self):
@@ -100,22 +130,29 @@ class TestDocumentPermissions(WagtailTestUtils, TestCase):
         self.assertFalse(self.document.is_editable_by_user(self.user))
 
 
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    },
+)
 class TestDocumentFilenameProperties(TestCase):
-    def setUp(self):
-        self.document = models.Document(title="Test document")
-        self.document.file.save(
+    @classmethod
+    def setUpTestData(cls):
+        cls.document = models.Document(title="Test document")
+        cls.document.file.save(
             "sample_name.doc",
             ContentFile("A boring example document"),
         )
 
-        self.pdf_document = models.Document(title="Test document")
-        self.pdf_document.file.save(
+        cls.pdf_document = models.Document(title="Test document")
+        cls.pdf_document.file.save(
             "sample_name.pdf",
             ContentFile("A boring example document"),
         )
 
-        self.extensionless_document = models.Document(title="Test document")
-        self.extensionless_document.file.save(
+        cls.extensionless_document = models.Document(title="Test document")
+        cls.extensionless_document.file.save(
             "sample_name",
             ContentFile("A boring example document"),
         )
@@ -130,6 +167,13 @@ class TestDocumentFilenameProperties(TestCase):
         self.assertEqual("pdf", self.pdf_document.file_extension)
         self.assertEqual("", self.extensionless_document.file_extension)
 
+    def test_file_extension_follows_file_name(self):
+        self.assertEqual("doc", self.document.file_extension)
+        self.document.file.name = "documents/sample_name.pdf"
+        self.assertEqual("pdf", self.document.file_extension)
+        self.document.file = "documents/sample_name"
+        self.assertEqual("", self.document.file_extension)
+
     def test_content_type(self):
         self.assertEqual("application/msword", self.document.content_type)
         self.assertEqual("application/pdf", self.pdf_document.content_type)
@@ -150,6 +194,20 @@ class TestDocumentFilenameProperties(TestCase):
             "7d8c4778b182e4f3bd442408c64a6e22a4b0ed85",
         )
 
+    def test_file_hash_is_stored(self):
+        self.document.get_file_hash()
+        self.assertEqual(
+            self.document.file_hash, "7d8c4778b182e4f3bd442408c64a6e22a4b0ed85"
+        )
+
+        # Once stored, the hash is returned without reading the file again
+        with mock.patch.object(self.document, "open_file") as open_file:
+            self.assertEqual(
+                self.document.get_file_hash(),
+                "7d8c4778b182e4f3bd442408c64a6e22a4b0ed85",
+            )
+        open_file.assert_not_called()
+
     def test_content_disposition(self):
         self.assertEqual(
             """attachment; filename=sample_name.doc; filename*=UTF-8''sample_name.doc""",
@@ -161,32 +219,26 @@ class TestDocumentFilenameProperties(TestCase):
             self.extensionless_document.content_disposition,
         )
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         # delete the FieldFile directly because the TestCase does not commit
         # transactions to trigger transaction.on_commit() in the signal handler
-        self.document.file.delete()
-        self.pdf_document.file.delete()
-        self.extensionless_document.file.delete()
+        cls.document.file.delete()
+        cls.pdf_document.file.delete()
+        cls.extensionless_document.file.delete()
+        super().tearDownClass()
 
 
-class TestFilesDeletedForDefaultModels(TransactionTestCase):
+class TestFilesDeletedForDefaultModels(TestCase):
     """
-    Because we expect file deletion to only happen once a transaction is
-    successfully committed, we must run these tests using TransactionTestCase
-    per the following documentation:
-
-        Django's TestCase class wraps each test in a transaction and rolls back that
-        transaction after each test, in order to provide test isolation. This means
-        that no transaction is ever actually committed, thus your on_commit()
-        callbacks will never be run. If you need to test the results of an
-        on_commit() callback, use a TransactionTestCase instead.
-        https://docs.djangoproject.com/en/1.10/topics/db/transactions/#use-in-tests
+    File deletion is deferred until the transaction is successfully committed.
+    TestCase never commits its transactions, so these tests use
+    captureOnCommitCallbacks(execute=True) to run the on_commit() callbacks
+    that would fire on a real commit.
     """
 
-    fixtures = ["test_empty.json"]
-
     def test_document_file_deleted_oncommit(self):
-        with transaction.atomic():
+        with self.captureOnCommitCallbacks(execute=True):
             document = get_document_model().objects.create(
                 title="Test Image", file=get_test_image_file()
             )
@@ -200,58 +252,52 @@ class TestFilesDeletedForDefaultModels(TransactionTestCase):
 
 @override_settings(WAGTAILDOCS_EXTENSIONS=["pdf"])
 class TestDocumentValidateExtensions(TestCase):
-    def setUp(self):
-        self.document_invalid = models.Document.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.document_invalid = models.Document.objects.create(
             title="Test document", file="test.doc"
         )
-        self.document_valid = models.Document.objects.create(
+        cls.document_valid = models.Document.objects.create(
             title="Test document", file="test.pdf"
         )
 
-    def test_create_doc_invalid_extension(self):
+    def test_validate_extension(self):
         """
         Checks if the uploaded document has the expected extensions
         mentioned in settings.WAGTAILDOCS_EXTENSIONS
 
-        This is caught in form.error and should be raised during model
-        creation when called full_clean. This specific testcase invalid
-        file extension is passed
-        """
-        with self.assertRaises(ValidationError):
-            self.document_invalid.full_clean()
-
-    def test_create_doc_valid_extension(self):
+        This is caught in form.error and should be raised by the model's
+        clean method, which full_clean calls. The other field validators are
+        not relevant here, so clean is called directly.
         """
-        Checks if the uploaded document has the expected extensions
-        mentioned in settings.WAGTAILDOCS_EXTENSIONS
+        with self.subTest(extension="doc"):
+            with self.assertRaises(ValidationError) as e:
+                self.document_invalid.clean()
+            self.assertEqual(
+                e.exception.messages,
+                ["File extension “doc” is not allowed. Allowed extensions are: pdf."],
+            )
 
-        This is caught in form.error and should be raised during
-        model creation when called full_clean. In this specific
-        testcase invalid file extension is passed.
-        """
-        try:
-            self.document_valid.full_clean()
-        except ValidationError:
-            self.fail("Validation error is raised even when valid file name is passed")
+        with self.subTest(extension="pdf"):
+            try:
+                self.document_valid.clean()
+            except ValidationError:
+                self.fail(
+                    "Validation error is raised even when valid file name is passed"
+                )
 
-    def tearDown(self):
-        self.document_invalid.file.delete()
-        self.document_valid.file.delete()
+    def test_extension_validator_is_reused(self):
+        validator = models.get_extension_validator(("pdf",))
+        self.assertIs(models.get_extension_validator(("pdf",)), validator)
+        self.assertEqual(validator.allowed_extensions, ["pdf"])
+        self.assertIsNot(models.get_extension_validator(("doc",)), validator)
 
 
 @override_settings(WAGTAILDOCS_DOCUMENT_MODEL="tests.CustomDocument")
 class TestFilesDeletedForCustomModels(TestFilesDeletedForDefaultModels):
-    def setUp(self):
-        # Required to create root collection because the TransactionTestCase
-        # does not make initial data loaded in migrations available and
-        # serialized_rollback=True causes other problems in the test suite.
-        # ref: https://docs.djangoproject.com/en/1.10/topics/testing/overview/#rollback-emulation
-        Collection.objects.get_or_create(
-            name="Root",
-            path="0001",
-            depth=1,
-            numchild=0,
-        )
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
 
         #: Sadly signal receivers only get connected when starting django.
         #: We will re-attach them here to mimic the django startup behaviour